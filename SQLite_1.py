@@ -1,4 +1,8 @@
+import re
 import sqlite3
+import sys
+from collections import OrderedDict
+from collections.abc import Mapping
 
 '''
 Exercise 0:
@@ -36,6 +40,127 @@ INSERT INTO `doctor` (`Doctor_Id`, `Doctor_Name`, `Hospital_Id`, `Joining_Date`,
 ('108', 'Marmor', '4', '2011-10-17', 'Radiologist', '130000', NULL)
 '''
 
+class QueryCache:
+    '''
+    Keeps the results of SELECT queries in memory so repeated listings don't hit the database.
+    Entries are keyed by the normalized SQL and its parameters and remember the version of every
+    table they read. execute_write() bumps the version of the table it writes, which makes any
+    cached result that read that table stale. The least recently used entries are evicted once
+    the cache holds more than max_bytes.
+    '''
+
+    def __init__(self, max_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.table_versions = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(sql, params):
+        # collapse whitespace so the same query written over several lines matches,
+        # but leave quoted strings alone since the spaces in them matter
+        sql = SQL_WHITESPACE.sub(lambda m: m.group(1) or ' ', sql).strip()
+        # named parameters ({"num": 1}) need their values in the key, not just the names
+        if isinstance(params, Mapping):
+            return (sql, tuple(sorted(params.items())))
+        return (sql, tuple(params))
+
+    @staticmethod
+    def size_of(rows):
+        # rough size of the result, good enough for the memory cap
+        return sys.getsizeof(rows) + sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+                                         for row in rows)
+
+    def versions(self, tables):
+        return tuple(self.table_versions.get(table.lower(), 0) for table in tables)
+
+    def bump(self, table):
+        table = table.lower()
+        self.table_versions[table] = self.table_versions.get(table, 0) + 1
+
+    def get(self, key, tables):
+        entry = self.entries.get(key)
+        if entry is not None:
+            versions, rows, size = entry
+            if versions == self.versions(tables):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return rows
+            # one of the tables changed since this was cached
+            del self.entries[key]
+            self.size -= size
+        self.misses += 1
+        return None
+
+    def put(self, key, tables, rows):
+        size = self.size_of(rows)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (self.versions(tables), rows, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, _, old_size) = self.entries.popitem(last=False)
+            self.size -= old_size
+            self.evictions += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'bytes': self.size}
+
+
+# a quoted string or name (kept as is) or a run of whitespace
+SQL_WHITESPACE = re.compile(r'''('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`)|\s+''')
+
+query_cache = QueryCache()
+# versions of hospital and doctor when hospital_employee was last built
+joined_versions = None
+
+# table name written by INSERT / REPLACE / UPDATE / DELETE / DROP / CREATE statements.
+# The name may be quoted and may have a schema in front (main.doctor), and must be
+# followed by whitespace, "(", ";" or the end, otherwise it doesn't match at all.
+SQL_NAME = r'''(?:\w+|"(?:[^"]|"")*"|`(?:[^`]|``)*`|'(?:[^']|'')*'|\[[^\]]*\])'''
+WRITE_TABLE = re.compile(r'''^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|
+                             DELETE\s+FROM|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|
+                             CREATE\s+(?:TEMP\s+|TEMPORARY\s+)?TABLE(?:\s+IF\s+NOT\s+EXISTS)?)
+                             \s+(?!(?:OR|IF)\s)(?:''' + SQL_NAME + r'''\s*\.\s*)?(''' + SQL_NAME + r''')(?=[\s(;]|$)''',
+                         re.IGNORECASE | re.VERBOSE)
+
+
+def unquote_name(name):
+    # "my table" -> my table, with doubled quotes inside turned back into one
+    if name[0] == '[':
+        return name[1:-1]
+    if name[0] in '"`\'':
+        return name[1:-1].replace(name[0] * 2, name[0])
+    return name
+
+
+def execute_write(sql, params=(), table=None):
+    # every write goes through here so the cache knows which table changed.
+    # Pass table when the statement isn't a plain INSERT / UPDATE / DELETE / DROP / CREATE.
+    if table is None:
+        match = WRITE_TABLE.match(sql)
+        if not match:
+            raise ValueError(f"Can't tell which table this statement writes, pass table=: {sql}")
+        table = unquote_name(match.group(1))
+    cur.execute(sql, params)
+    query_cache.bump(table)
+
+
+def cached_query(sql, params=(), tables=()):
+    # tables lists every table the query reads, used to invalidate the cached result
+    key = query_cache.make_key(sql, params)
+    rows = query_cache.get(key, tables)
+    if rows is None:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        query_cache.put(key, tables, rows)
+    return rows
+
+
 def connect_database():
     global conn, cur
        
@@ -44,8 +169,8 @@ def connect_database():
     cur = conn.cursor()    
     
 def create_database():
-    cur.execute('''DROP TABLE IF EXISTS hospital;''')
-    cur.execute('''CREATE TABLE IF NOT EXISTS "hospital" (
+    execute_write('''DROP TABLE IF EXISTS hospital;''')
+    execute_write('''CREATE TABLE IF NOT EXISTS "hospital" (
             "Hospital_Id"	INTEGER NOT NULL,
             "Hospital_Name"	TEXT NOT NULL,
             "Bed_Count"	INTEGER,
@@ -53,15 +178,15 @@ def create_database():
             );''')
     
     
-    cur.execute('''INSERT INTO hospital ('Hospital_Id', 'Hospital_Name', 'Bed_Count') VALUES
+    execute_write('''INSERT INTO hospital ('Hospital_Id', 'Hospital_Name', 'Bed_Count') VALUES
                 ('1', 'Toronto General Hospital', '471'),
                 ('2', "St. Joseph's Health Centre", '376'),
                 ('3', 'Mississauga Hospital', '751'),
                 ('4', 'Credit Valley Hospital', '382')''')
     
-    cur.execute('''DROP TABLE IF EXISTS "doctor";''')
+    execute_write('''DROP TABLE IF EXISTS "doctor";''')
     
-    cur.execute('''CREATE TABLE "doctor" (
+    execute_write('''CREATE TABLE "doctor" (
             "Doctor_Id"	INTEGER NOT NULL,
             "Doctor_Name"	TEXT NOT NULL,
             "Hospital_Id"	INTEGER NOT NULL,
@@ -72,7 +197,7 @@ def create_database():
             PRIMARY KEY("Doctor_Id")
             );''')
     
-    cur.execute('''INSERT INTO 'doctor' 
+    execute_write('''INSERT INTO 'doctor' 
     ('Doctor_Id', 'Doctor_Name', 'Hospital_Id', 'Joining_Date', 'Speciality', 'Salary', 'Experience') VALUES
             ('101', 'Duemler', '1', '2005-02-10', 'Pediatric', '140000', NULL),
             ('102', 'McBroom', '1', '2018-07-23', 'Oncologist', '120000', NULL),
@@ -84,29 +209,26 @@ def create_database():
             ('108', 'Marmor', '4', '2011-10-17', 'Radiologist', '130000', NULL)''')
 
 def exercise_1():
-'''
-Exericse 1:
-List all doctors by specialty. First, list the name of the specialty. Then list all doctors associated with the specialty.
-Their names should be displayed as "Dr. Lastname". Both the specialties and doctors should be listed in alphabetical order.
-'''
+    '''
+    Exericse 1:
+    List all doctors by specialty. First, list the name of the specialty. Then list all doctors associated with the specialty.
+    Their names should be displayed as "Dr. Lastname". Both the specialties and doctors should be listed in alphabetical order.
+    '''
     
-    cur.execute("SELECT Speciality, Doctor_Name FROM doctor ORDER BY Speciality, Doctor_Name")
-    
-    rows = cur.fetchall()
+    rows = cached_query("SELECT Speciality, Doctor_Name FROM doctor ORDER BY Speciality, Doctor_Name",
+                        tables=('doctor',))
     
     for row in rows:
         # this is for SELECT * FROM doctor
         print(f"{row[0]:<26} Dr. {row[1]}")
 
 def exercise_2():
-'''
-Exercise 2:
-Display a numbered list of all the hospitals and allow the user to choose one. Ensure they choose a valid number, otherwise continually prompt them for a correct number.
-Then, display all doctors associated with that hospital. Their names should be displayed as "Dr. Lastname -- Specialty"
-'''
-    cur.execute("SELECT * FROM hospital")    
-    
-    rows = cur.fetchall()
+    '''
+    Exercise 2:
+    Display a numbered list of all the hospitals and allow the user to choose one. Ensure they choose a valid number, otherwise continually prompt them for a correct number.
+    Then, display all doctors associated with that hospital. Their names should be displayed as "Dr. Lastname -- Specialty"
+    '''
+    rows = cached_query("SELECT * FROM hospital", tables=('hospital',))
     for row in rows:
         print(f"{row[0]:<3} {row[1]:<27} {row[2]}")
     
@@ -116,40 +238,42 @@ Then, display all doctors associated with that hospital. Their names should be d
     while data == None:
         try:
             num = int(input("Select a hospital ID: "))
-            cur.execute("SELECT * FROM hospital WHERE Hospital_Id=(?)", (num, ))            
-            data = cur.fetchone()
+            rows = cached_query("SELECT * FROM hospital WHERE Hospital_Id=(?)", (num, ), tables=('hospital',))
+            data = rows[0] if rows else None
             #print(data)
         except ValueError:
             num = -1
 
-    # inner join the 2 tables
-    cur.execute('''DROP TABLE IF EXISTS "hospital_employee"''')    
-    cur.execute('''CREATE TABLE "hospital_employee" AS
-    SELECT Hospital_Name, doctor.Doctor_Name, Speciality, Doctor_Id, Experience, hospital.Hospital_Id
-    FROM hospital
-    INNER JOIN doctor ON doctor.Hospital_Id = hospital.Hospital_Id''')
+    # inner join the 2 tables, only redone when hospital or doctor changed since the last join
+    global joined_versions
+    if joined_versions != query_cache.versions(('hospital', 'doctor')):
+        execute_write('''DROP TABLE IF EXISTS "hospital_employee"''')    
+        execute_write('''CREATE TABLE "hospital_employee" AS
+        SELECT Hospital_Name, doctor.Doctor_Name, Speciality, Doctor_Id, Experience, hospital.Hospital_Id
+        FROM hospital
+        INNER JOIN doctor ON doctor.Hospital_Id = hospital.Hospital_Id''')
+        joined_versions = query_cache.versions(('hospital', 'doctor'))
     
     #cur.execute("""SELECT * FROM hospital_employee WHERE Hospital_Id=:num""", {"num":num})
-    cur.execute("""SELECT * FROM hospital_employee WHERE Hospital_Id=(?)""", (num,)) # add the comma otherwise it thinks its a tuple
-    
-    rows = cur.fetchall()
+    rows = cached_query("""SELECT * FROM hospital_employee WHERE Hospital_Id=(?)""", (num,), # add the comma otherwise it thinks its a tuple
+                        tables=('hospital_employee',))
     print(f"\nFor {rows[0][0]}, there are the following doctors:")
     for row in rows:
         #print(row)
         print(f" Dr. {row[1]} -- {row[2]}")
 
 def exercise_3():
-'''
-Exercise 3:
-Ask the user to specify a number of years. Then, display all doctors who have been with the hospital at least that long.
-Use the difference between the joining date and today's date to calculate that number.
-Their names should be displayed as "Dr. Lastname (Hospital Name)"
-
-Tips:
-Define the parameterized query.
-Use cursor.execute() to execute query.
-Fetch result using cursor.fetchall().
-'''
+    '''
+    Exercise 3:
+    Ask the user to specify a number of years. Then, display all doctors who have been with the hospital at least that long.
+    Use the difference between the joining date and today's date to calculate that number.
+    Their names should be displayed as "Dr. Lastname (Hospital Name)"
+
+    Tips:
+    Define the parameterized query.
+    Use cursor.execute() to execute query.
+    Fetch result using cursor.fetchall().
+    '''
     # date difference
     cur.execute("""SELECT Doctor_Id, Doctor_Name, Experience, Joining_Date FROM doctor""")    
     rows = cur.fetchall()
@@ -162,8 +286,8 @@ Fetch result using cursor.fetchall().
         for date in dates:
             #print(date)
             year = date // 365
-            cur.execute("UPDATE doctor SET Experience=(?) WHERE Doctor_Id=(?)", (year, row[0],))
-            cur.execute("UPDATE hospital_employee SET Experience=(?) WHERE Doctor_Id=(?)", (year, row[0],))
+            execute_write("UPDATE doctor SET Experience=(?) WHERE Doctor_Id=(?)", (year, row[0],))
+            execute_write("UPDATE hospital_employee SET Experience=(?) WHERE Doctor_Id=(?)", (year, row[0],))
     
     # not insert into - creates new rows
     # use update as there's data already
@@ -176,8 +300,8 @@ Fetch result using cursor.fetchall().
         except ValueError:
             num_years = -1     
     
-    cur.execute("SELECT * from hospital_employee WHERE Experience > (?)", (num_years,))
-    rows = cur.fetchall()
+    rows = cached_query("SELECT * from hospital_employee WHERE Experience > (?)", (num_years,),
+                        tables=('hospital_employee',))
     
     for row in rows:
         #print(row)
@@ -197,4 +321,5 @@ if __name__ == '__main__':
     exercise_1()
     exercise_2()
     exercise_3()
+    print(f"\nQuery cache: {query_cache.stats()}")
     close_database()
@@ -0,0 +1,109 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup benchmark for tkinter_project.py
+# Measures, in a fresh process each run:
+#   - how long "import tkinter_project" takes
+#   - how long "import pandas, matplotlib.pyplot" takes (what every startup paid before)
+#   - time from starting the process until the login question dialog is on screen,
+#     for the current startup and for the old one that imported pandas/matplotlib
+#     and read the CSV before showing anything
+# Run from anywhere: python benchmarks/bench_startup.py [runs]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = """
+import time
+t0 = time.perf_counter()
+import tkinter_project
+print(time.perf_counter() - t0)
+"""
+
+IMPORT_HEAVY = """
+import time
+t0 = time.perf_counter()
+import pandas, matplotlib.pyplot
+print(time.perf_counter() - t0)
+"""
+
+# Runs main() the way __main__ does. Every Tk root gets a <Map> binding on the
+# "all" tag, which the askquestion dialog's toplevel also has, so the process
+# reports and exits as soon as the first dialog is actually mapped.
+# {startup} is replaced by the new or the old startup code.
+FIRST_DIALOG = """
+import os
+import tkinter
+
+class Tk(tkinter.Tk):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bind_all('<Map>', mapped)
+
+def mapped(event):
+    print('WINDOW', flush=True)
+    os._exit(0)
+
+tkinter.Tk = Tk
+{startup}
+tkinter_project.main()
+"""
+
+CURRENT_STARTUP = """
+import tkinter_project
+tkinter_project.load_inventory_async('SalesKaggle3new.csv')
+"""
+
+# What __main__ did before the lazy imports and the background load
+BASELINE_STARTUP = """
+import pandas, matplotlib.pyplot
+import tkinter_project
+tkinter_project.read_csv('SalesKaggle3new.csv')
+"""
+
+
+def run_timed(code):
+    # Time of the run as printed by the child process itself
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip())
+
+
+def run_first_dialog(startup):
+    # Wall clock time from launching the process until it reports the dialog
+    code = FIRST_DIALOG.replace('{startup}', startup)
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, err = proc.communicate()
+    if not line.startswith('WINDOW'):
+        raise RuntimeError(err.strip().splitlines()[-1] if err.strip() else 'no window was shown')
+    return elapsed
+
+
+def report(name, func, runs):
+    try:
+        times = [func() for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"{name:<34} skipped ({e})")
+        return
+    print(f"{name:<34} median {statistics.median(times) * 1000:8.1f} ms   "
+          f"min {min(times) * 1000:8.1f} ms")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{runs} runs each")
+    report("import tkinter_project", lambda: run_timed(IMPORT_APP), runs)
+    report("import pandas, matplotlib.pyplot", lambda: run_timed(IMPORT_HEAVY), runs)
+    report("start to login dialog (baseline)", lambda: run_first_dialog(BASELINE_STARTUP), runs)
+    report("start to login dialog (current)", lambda: run_first_dialog(CURRENT_STARTUP), runs)
+
+
+if __name__ == '__main__':
+    main()
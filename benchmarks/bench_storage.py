@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Writes/sec benchmark for storage.py
+# Compares one thread appending rows with several threads appending at once,
+# where group commit lets a burst of writes share one temp file and fsync.
+# Run from anywhere: python benchmarks/bench_storage.py [writes] [threads]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+
+def count_commits():
+    # Wrap _commit to count how many batches were written
+    commit = storage._commit
+    batches = []
+
+    def counting_commit(batch):
+        batches.append(len(batch))
+        return commit(batch)
+
+    storage._commit = counting_commit
+    return batches, commit
+
+
+def run(path, writes, threads):
+    storage.write_rows(path, [['Username', 'HashedPassword']])
+    batches, commit = count_commits()
+
+    def writer(n):
+        for i in range(writes // threads):
+            storage.append_row(path, [f'user{n}_{i}', 'hash'])
+
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    storage._commit = commit
+
+    total = sum(batches)
+    print(f"{threads:>2} thread(s): {total} writes in {elapsed:.2f} s = {total / elapsed:8.0f} writes/sec, "
+          f"{len(batches)} commits ({total / len(batches):.1f} writes per fsync)")
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'users.csv')
+        run(path, writes, 1)
+        run(path, writes, threads)
+
+
+if __name__ == '__main__':
+    main()
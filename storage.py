@@ -0,0 +1,236 @@
+import csv
+import io
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+# Crash-safe writes for the CSV files the inventory app keeps on disk.
+# Every write goes to a temp file in the same folder, is fsync'd, and is then
+# renamed over the real file, so a crash leaves either the old or the new
+# file and never a half written one.
+# https://lwn.net/Articles/457667/
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl, use msvcrt for the lock instead
+    fcntl = None
+    import msvcrt
+
+# Writes waiting for the next group commit
+_pending = []
+_cond = threading.Condition()
+_committing = False
+# Batch that new writes join, and the last batch that is on disk
+_next_batch = 1
+_committed_batch = 0
+
+
+@contextmanager
+def file_lock(path):
+    # Lock a "<path>.lock" file so other processes running the app wait for us
+    with open(path + '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _fsync_dir(directory):
+    # The rename is only durable once the folder itself is synced.
+    # Windows can't open a folder, so this is skipped there.
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _create_temp(path):
+    # Like tempfile.mkstemp, but created with mode 0666 so the kernel applies the
+    # umask and a new file gets the same permissions open() would give it
+    directory = os.path.dirname(os.path.abspath(path))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_path = os.path.join(directory, f'.{os.path.basename(path)}.{os.urandom(6).hex()}.tmp')
+        try:
+            return os.open(temp_path, flags, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def _write_temp(path, text):
+    fd, temp_path = _create_temp(path)
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            f.write(text)
+            f.flush()
+            # An existing file keeps its own permissions
+            try:
+                shutil.copymode(path, temp_path)
+            except FileNotFoundError:
+                pass
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _read_text(path):
+    try:
+        with open(path, newline='') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+
+def _apply(path, ops):
+    # Apply the queued writes for one file in order, starting from what is on disk.
+    # An op that fails gets its own error and is skipped, the others still apply.
+    # Returns the new text and the ops that were applied.
+    text = None
+    applied = []
+    for op in ops:
+        try:
+            if op['mode'] != 'replace' and text is None:
+                text = _read_text(path)
+            if op['mode'] == 'replace':
+                new_text = op['data']
+            elif op['mode'] == 'append':
+                new_text = text + op['data']
+            else:
+                rows = list(csv.reader(io.StringIO(text, newline='')))
+                new_text = _rows_to_text(op['data'](rows))
+        except Exception as e:
+            op['error'] = e
+            continue
+        text = new_text
+        applied.append(op)
+    return text, applied
+
+
+def _commit(batch):
+    # Group the writes by file so several writes to one file in a burst only
+    # cost a single temp file and fsync.
+    # Sets op['error'] on every op that did not make it to disk.
+    by_path = {}
+    for op in batch:
+        by_path.setdefault(os.path.abspath(op['path']), []).append(op)
+
+    directories = {}
+    for path, ops in by_path.items():
+        applied = ops
+        try:
+            # Read, change and replace the file all while holding the lock so
+            # another process can't write it in between
+            with file_lock(path):
+                text, applied = _apply(path, ops)
+                if not applied:
+                    continue
+                temp_path = _write_temp(path, text)
+                try:
+                    os.replace(temp_path, path)
+                except BaseException:
+                    os.remove(temp_path)
+                    raise
+        except Exception as e:
+            for op in applied:
+                op['error'] = e
+        else:
+            directories.setdefault(os.path.dirname(path), []).extend(applied)
+
+    for directory, ops in directories.items():
+        try:
+            _fsync_dir(directory)
+        except Exception as e:
+            for op in ops:
+                op['error'] = e
+
+
+def _submit(path, mode, data):
+    global _committing, _next_batch, _committed_batch
+
+    op = {'path': path, 'mode': mode, 'data': data, 'error': None}
+    with _cond:
+        _pending.append(op)
+        my_batch = _next_batch
+
+        while _committed_batch < my_batch:
+            if _committing:
+                # Another thread is writing, our op goes in the next batch
+                _cond.wait()
+                continue
+
+            # Nobody is writing, so this thread commits everything queued so far
+            _committing = True
+            batch = _pending[:]
+            del _pending[:]
+            batch_no = _next_batch
+            _next_batch += 1
+
+            _cond.release()
+            try:
+                _commit(batch)
+            except Exception as e:
+                for batch_op in batch:
+                    batch_op['error'] = e
+            finally:
+                _cond.acquire()
+                _committed_batch = batch_no
+                _committing = False
+                _cond.notify_all()
+
+    if op['error'] is not None:
+        raise op['error']
+
+
+def replace_text(path, text):
+    """Atomically replace the contents of path with text."""
+    _submit(path, 'replace', text)
+
+
+def append_text(path, text):
+    """Atomically add text to the end of path."""
+    _submit(path, 'append', text)
+
+
+def update_rows(path, fn):
+    """Atomically read a CSV file, pass its rows (header included) to fn and
+    replace the file with the rows fn returns, all under the file lock."""
+    _submit(path, 'update', fn)
+
+
+def _rows_to_text(rows):
+    buffer = io.StringIO(newline='')
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def write_rows(path, rows):
+    """Atomically replace a CSV file with rows (header included)."""
+    replace_text(path, _rows_to_text(rows))
+
+
+def append_row(path, row):
+    """Atomically add one row to the end of a CSV file."""
+    append_text(path, _rows_to_text([row]))
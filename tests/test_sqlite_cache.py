@@ -0,0 +1,108 @@
+import sqlite3
+
+import pytest
+
+import SQLite_1
+
+
+@pytest.fixture
+def db(monkeypatch):
+    conn = sqlite3.connect(':memory:')
+    monkeypatch.setattr(SQLite_1, 'conn', conn, raising=False)
+    monkeypatch.setattr(SQLite_1, 'cur', conn.cursor(), raising=False)
+    monkeypatch.setattr(SQLite_1, 'query_cache', SQLite_1.QueryCache())
+    SQLite_1.create_database()
+    yield conn
+    conn.close()
+
+
+def test_make_key_collapses_whitespace_outside_quotes():
+    make_key = SQLite_1.QueryCache.make_key
+    assert make_key("SELECT *  FROM t\n WHERE n=?", (1,)) == make_key(" SELECT * FROM t WHERE n=?", (1,))
+    assert make_key("SELECT * FROM t WHERE n='a  b'", ()) != make_key("SELECT * FROM t WHERE n='a b'", ())
+
+
+def test_repeated_query_is_served_from_cache(db):
+    sql = "SELECT Doctor_Name FROM doctor ORDER BY Doctor_Name"
+    first = SQLite_1.cached_query(sql, tables=('doctor',))
+    second = SQLite_1.cached_query(sql, tables=('doctor',))
+
+    assert first == second
+    assert SQLite_1.query_cache.stats()['hits'] == 1
+    assert SQLite_1.query_cache.stats()['misses'] == 1
+
+
+def test_write_invalidates_cached_result(db):
+    sql = "SELECT Doctor_Name FROM doctor WHERE Doctor_Id=?"
+    assert SQLite_1.cached_query(sql, (101,), tables=('doctor',)) == [('Duemler',)]
+
+    SQLite_1.execute_write("UPDATE doctor SET Doctor_Name=? WHERE Doctor_Id=?", ('Smith', 101))
+
+    assert SQLite_1.cached_query(sql, (101,), tables=('doctor',)) == [('Smith',)]
+
+
+def test_named_parameters_are_part_of_key(db):
+    sql = "SELECT Doctor_Name FROM doctor WHERE Doctor_Id=:id"
+
+    assert SQLite_1.cached_query(sql, {"id": 101}, tables=('doctor',)) == [('Duemler',)]
+    assert SQLite_1.cached_query(sql, {"id": 102}, tables=('doctor',)) == [('McBroom',)]
+
+
+@pytest.mark.parametrize("sql", [
+    "UPDATE OR REPLACE doctor SET Doctor_Name='Smith' WHERE Doctor_Id=101",
+    "UPDATE main.doctor SET Doctor_Name='Smith' WHERE Doctor_Id=101",
+    'UPDATE "main"."doctor" SET Doctor_Name=\'Smith\' WHERE Doctor_Id=101',
+    "REPLACE INTO doctor (Doctor_Id, Doctor_Name, Hospital_Id, Joining_Date) VALUES (101, 'Smith', 1, '2005-02-10')",
+    "INSERT OR REPLACE INTO main.doctor (Doctor_Id, Doctor_Name, Hospital_Id, Joining_Date) "
+    "VALUES (101, 'Smith', 1, '2005-02-10')",
+])
+def test_write_statement_invalidates_its_table(db, sql):
+    query = "SELECT Doctor_Name FROM doctor WHERE Doctor_Id=?"
+    SQLite_1.cached_query(query, (101,), tables=('doctor',))
+
+    SQLite_1.execute_write(sql)
+
+    assert SQLite_1.cached_query(query, (101,), tables=('doctor',)) == [('Smith',)]
+
+
+def test_quoted_table_name_with_space(db):
+    SQLite_1.execute_write('CREATE TABLE "my table" (n TEXT)')
+    query = 'SELECT n FROM "my table"'
+    assert SQLite_1.cached_query(query, tables=('my table',)) == []
+
+    SQLite_1.execute_write('INSERT INTO "my table" VALUES (?)', ('a',))
+
+    assert SQLite_1.cached_query(query, tables=('my table',)) == [('a',)]
+
+
+@pytest.mark.parametrize("sql", [
+    "WITH new AS (SELECT 109, 'Smith', 1, '2005-02-10') INSERT INTO doctor "
+    "(Doctor_Id, Doctor_Name, Hospital_Id, Joining_Date) SELECT * FROM new",
+    "UPDATE OR REPLACE doctor/* note */ SET Doctor_Name='Smith'",
+    "ALTER TABLE doctor ADD COLUMN Phone TEXT",
+])
+def test_write_to_unknown_table_raises(db, sql):
+    with pytest.raises(ValueError):
+        SQLite_1.execute_write(sql)
+
+
+def test_explicit_table_is_bumped(db):
+    sql = "SELECT Doctor_Name FROM doctor WHERE Doctor_Id=?"
+    SQLite_1.cached_query(sql, (101,), tables=('doctor',))
+
+    SQLite_1.execute_write("REPLACE INTO doctor (Doctor_Id, Doctor_Name, Hospital_Id, Joining_Date) "
+                           "VALUES (101, 'Smith', 1, '2005-02-10')", table='doctor')
+
+    assert SQLite_1.cached_query(sql, (101,), tables=('doctor',)) == [('Smith',)]
+
+
+def test_lru_eviction_respects_memory_cap():
+    cache = SQLite_1.QueryCache(max_bytes=2000)
+    rows = [(i, 'x' * 20) for i in range(5)]
+    for n in range(10):
+        cache.put(cache.make_key("SELECT ?", (n,)), (), rows)
+
+    assert cache.size <= 2000
+    assert cache.stats()['evictions'] > 0
+    assert cache.get(cache.make_key("SELECT ?", (9,)), ()) == rows
+    assert cache.get(cache.make_key("SELECT ?", (0,)), ()) is None
@@ -0,0 +1,200 @@
+import os
+import random
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import storage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OLD_ROWS = [['Product_id', 'Name']] + [[str(i), 'old'] for i in range(2000)]
+NEW_ROWS = [['Product_id', 'Name']] + [[str(i), 'new'] for i in range(2000)]
+
+
+def csv_text(rows):
+    return ''.join(','.join(row) + '\r\n' for row in rows)
+
+
+def read_file(path):
+    with open(path, newline='') as f:
+        return f.read()
+
+
+def start_child(code, cwd):
+    # Child process that writes with storage; it is killed by the tests
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.Popen([sys.executable, '-c', code], cwd=cwd, env=env,
+                            stdout=subprocess.PIPE, text=True)
+
+
+def kill_at_marker(code, cwd):
+    # Run the child until it prints MARK, then SIGKILL it
+    proc = start_child(code, cwd)
+    assert proc.stdout.readline().strip() == 'MARK'
+    proc.kill()
+    proc.wait()
+
+
+def test_kill_before_rename_keeps_old_file(tmp_path):
+    path = tmp_path / 'inventory.csv'
+    storage.write_rows(str(path), OLD_ROWS)
+
+    # The temp file is written and fsync'd, the process dies before the rename
+    kill_at_marker(f"""
+import os, time, storage
+def replace(src, dst):
+    print('MARK', flush=True)
+    time.sleep(60)
+os.replace = replace
+storage.write_rows('inventory.csv', {NEW_ROWS!r})
+""", tmp_path)
+
+    assert read_file(path) == csv_text(OLD_ROWS)
+
+
+def test_kill_after_rename_keeps_new_file(tmp_path):
+    path = tmp_path / 'inventory.csv'
+    storage.write_rows(str(path), OLD_ROWS)
+
+    # The rename happened, the process dies before the folder fsync
+    kill_at_marker(f"""
+import time, storage
+def fsync_dir(directory):
+    print('MARK', flush=True)
+    time.sleep(60)
+storage._fsync_dir = fsync_dir
+storage.write_rows('inventory.csv', {NEW_ROWS!r})
+""", tmp_path)
+
+    assert read_file(path) == csv_text(NEW_ROWS)
+
+
+def test_kill_at_random_points_never_tears_file(tmp_path):
+    path = tmp_path / 'inventory.csv'
+    storage.write_rows(str(path), OLD_ROWS)
+
+    for _ in range(10):
+        proc = start_child(f"""
+import storage
+print('MARK', flush=True)
+while True:
+    storage.write_rows('inventory.csv', {NEW_ROWS!r})
+    storage.write_rows('inventory.csv', {OLD_ROWS!r})
+""", tmp_path)
+        assert proc.stdout.readline().strip() == 'MARK'
+        time.sleep(random.uniform(0, 0.2))
+        proc.kill()
+        proc.wait()
+
+        assert read_file(path) in (csv_text(OLD_ROWS), csv_text(NEW_ROWS))
+
+
+def test_update_rows_across_processes_loses_nothing(tmp_path):
+    path = tmp_path / 'counter.csv'
+    storage.write_rows(str(path), [['count'], ['0']])
+
+    code = """
+import storage
+def increment(rows):
+    rows[1][0] = int(rows[1][0]) + 1
+    return rows
+for _ in range(50):
+    storage.update_rows('counter.csv', increment)
+"""
+    procs = [start_child(code, tmp_path) for _ in range(2)]
+    for proc in procs:
+        assert proc.wait() == 0
+
+    assert read_file(path) == 'count\r\n100\r\n'
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="POSIX permissions")
+def test_keeps_file_permissions(tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text('Username,HashedPassword\n')
+    os.chmod(path, 0o644)
+
+    storage.append_row(str(path), ['user', 'hash'])
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="POSIX permissions")
+def test_new_file_follows_umask(tmp_path):
+    path = tmp_path / 'users.csv'
+    reference = tmp_path / 'reference.csv'
+    reference.write_text('')
+
+    storage.append_row(str(path), ['user', 'hash'])
+
+    # Same permissions as a file made with open()
+    assert stat.S_IMODE(os.stat(path).st_mode) == stat.S_IMODE(os.stat(reference).st_mode)
+
+
+def test_concurrent_writes_share_commits(tmp_path, monkeypatch):
+    path = tmp_path / 'users.csv'
+    commit = storage._commit
+    batches = []
+
+    def slow_commit(batch):
+        batches.append(len(batch))
+        time.sleep(0.01)
+        return commit(batch)
+
+    monkeypatch.setattr(storage, '_commit', slow_commit)
+
+    def writer(n):
+        for i in range(20):
+            storage.append_row(str(path), [f'user{n}_{i}', 'hash'])
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = read_file(path).splitlines()
+    assert sorted(lines) == sorted(f'user{n}_{i},hash' for n in range(8) for i in range(20))
+    assert sum(batches) == 160
+    assert len(batches) < 160
+
+
+def test_error_only_reported_for_failed_file(tmp_path):
+    good = str(tmp_path / 'good.csv')
+    bad = str(tmp_path / 'missing_folder' / 'bad.csv')
+    good_op = {'path': good, 'mode': 'append', 'data': 'a,b\r\n', 'error': None}
+    bad_op = {'path': bad, 'mode': 'append', 'data': 'a,b\r\n', 'error': None}
+
+    storage._commit([good_op, bad_op])
+
+    assert good_op['error'] is None
+    assert isinstance(bad_op['error'], OSError)
+    assert read_file(good) == 'a,b\r\n'
+
+
+def test_failed_update_does_not_drop_other_writes_to_same_file(tmp_path):
+    path = str(tmp_path / 'inventory.csv')
+    storage.write_rows(path, [['Product_id', 'Name'], ['1', 'Banana']])
+
+    def fail(rows):
+        raise ValueError("bad row")
+
+    def rename(rows):
+        rows[1][1] = 'Apple'
+        return rows
+
+    ops = [
+        {'path': path, 'mode': 'append', 'data': '2,Rice\r\n', 'error': None},
+        {'path': path, 'mode': 'update', 'data': fail, 'error': None},
+        {'path': path, 'mode': 'update', 'data': rename, 'error': None},
+    ]
+    storage._commit(ops)
+
+    assert [op['error'] for op in ops[::2]] == [None, None]
+    assert isinstance(ops[1]['error'], ValueError)
+    assert read_file(path) == 'Product_id,Name\r\n1,Apple\r\n2,Rice\r\n'
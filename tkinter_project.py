@@ -1,14 +1,23 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
 import csv
-import matplotlib.pyplot as plt
-import pandas as pd
+import threading
+
+# Crash-safe atomic writes for the CSV files
+import storage
+
+# pandas and matplotlib take seconds to import on a handheld, so they are
+# imported inside the functions that use them instead of at the top.
 
 # Used bcrypt for password hashing
 # https://pypi.org/project/bcrypt/
 import bcrypt
 
 inventory_data = {}
+# Set once the background load of the inventory CSV has finished
+inventory_loaded = threading.Event()
+# Exception raised by the background load, if it failed
+inventory_error = None
 
 
 def authenticate_user(username, password):
@@ -110,10 +119,8 @@ def create_user_gui(master):
     # https://stackoverflow.com/questions/18766955/how-to-write-utf-8-in-a-csv-file
     # hash the password
     hashed_pw = hash_password(new_password)
-    with open('users.csv', 'a', newline='') as f:
-        # stores new user
-        writer = csv.writer(f)
-        writer.writerow([new_username, hashed_pw.decode('utf-8')])
+    # stores new user
+    storage.append_row('users.csv', [new_username, hashed_pw.decode('utf-8')])
 
     messagebox.showinfo("Registration", "User registered successfully.")
     return True
@@ -130,13 +137,13 @@ def create_user(username, password):
     # https://stackoverflow.com/questions/18766955/how-to-write-utf-8-in-a-csv-file
     hashed_pw = hash_password(password)
     # Append the new user to DB
-    with open('users.csv', 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([username, hashed_pw.decode('utf-8')])
+    storage.append_row('users.csv', [username, hashed_pw.decode('utf-8')])
 
 
 def read_csv(filename):
     global inventory_data
+    import pandas as pd
+
     df = pd.read_csv(filename)
 
     # Calculate lifetime sales for each item
@@ -155,6 +162,24 @@ def read_csv(filename):
                                    'category': category, 'lifetime_sold': lifetime_sold}
 
 
+def load_inventory_async(filename):
+    # Load the inventory in a worker thread so the login dialog can show
+    # right away. The thread only fills inventory_data, it never touches tkinter.
+    def worker():
+        global inventory_error
+        try:
+            read_csv(filename)
+        except Exception as e:
+            # Keep the error so the inventory window can show it
+            inventory_error = e
+        finally:
+            inventory_loaded.set()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
+
+
 # Function to open the inventory GUI
 def open_inventory():
     # Nested Function
@@ -238,6 +263,34 @@ def open_inventory():
     sell_item_button = ttk.Button(right_frame, text="Sell Item", command=sell_item)
     sell_item_button.pack(fill=tk.BOTH, padx=10, pady=10)
 
+    # Show a progress bar and keep the buttons disabled until the inventory
+    # has finished loading in the background. If loading failed they stay disabled.
+    if not inventory_loaded.is_set() or inventory_error is not None:
+        buttons = [view_inventory_button, add_item_button, remove_item_button, missing_items_button,
+                   lifetime_sales_button, plot_sales_button, plot_new_sales_button, sell_item_button]
+        for button in buttons:
+            button.state(["disabled"])
+
+        progress = ttk.Progressbar(root, mode="indeterminate")
+        progress.pack(side="bottom", fill=tk.X, padx=20, pady=10)
+        progress.start(10)
+
+        # https://tkdocs.com/tutorial/eventloop.html
+        def check_loaded():
+            if inventory_loaded.is_set():
+                progress.stop()
+                progress.destroy()
+                if inventory_error is not None:
+                    messagebox.showerror("Error", f"Could not load the inventory:\n{inventory_error}",
+                                         parent=root)
+                    return
+                for button in buttons:
+                    button.state(["!disabled"])
+            else:
+                root.after(100, check_loaded)
+
+        check_loaded()
+
     root.mainloop()
 
 
@@ -290,23 +343,15 @@ def add_item():
                     inventory_data[item_id]["quantity"] += new_quantity
 
                     # Update the CSV file with the updated quantity
-                    with open('SalesKaggle3new.csv', mode='r+', newline='') as csvfile:
-                        reader = csv.reader(csvfile)
-                        header = next(reader)
-                        rows = [row for row in reader]
-                        for row in rows:
+                    def update_quantity(rows):
+                        for row in rows[1:]:
                             if int(row[0]) == item_id:
                                 row[3] = inventory_data[item_id]["quantity"]  # Update quantity in CSV
                                 break
-                        # https://stackoverflow.com/questions/431752/python-csv-reader-how-do-i-return-to-the-top-of-the-file
-                        csvfile.seek(0)  # Move to the beginning of the file
-                        
-                        writer = csv.writer(csvfile)
-                        writer.writerow(header)
-                        writer.writerows(rows)
+                        return rows
 
-                        # https://www.w3schools.com/python/ref_file_truncate.asp
-                        csvfile.truncate()  # Truncate extra data
+                    # Read and rewrite the whole file under the lock instead of truncating it in place
+                    storage.update_rows('SalesKaggle3new.csv', update_quantity)
 
                     messagebox.showinfo("Update Quantity", f"Quantity updated for item '{item_name}'.")
                     return  # Exit the function
@@ -326,10 +371,9 @@ def add_item():
             inventory_data[item_id]["lifetime_sold"] = lifetime_sold
 
             # Append
-            with open('SalesKaggle3new.csv', mode='a', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow([item_id, item_name, item_price, item_quantity, item_category,
-                                 inventory_data[item_id]["MissingQty"], 0, 0, lifetime_sold])
+            storage.append_row('SalesKaggle3new.csv',
+                               [item_id, item_name, item_price, item_quantity, item_category,
+                                inventory_data[item_id]["MissingQty"], 0, 0, lifetime_sold])
 
             messagebox.showinfo("Add Item", f"{item_name} added to inventory.")
 
@@ -339,17 +383,13 @@ def remove_item():
     if item_id in inventory_data:
         del inventory_data[item_id]
 
-        with open('SalesKaggle3new.csv', mode='r', newline='') as csvfile:
-            reader = csv.reader(csvfile)
-            header = next(reader)
+        # Rewrite the CSV file without the removed item
+        def without_item(rows):
+            header = rows[0]
             # Remove item from CSV data
-            rows = [row for row in reader if int(row[0]) != item_id]
+            return [header] + [row for row in rows[1:] if int(row[0]) != item_id]
 
-        # Rewrite the CSV file without the removed item
-        with open('SalesKaggle3new.csv', mode='w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(header)
-            writer.writerows(rows)
+        storage.update_rows('SalesKaggle3new.csv', without_item)
 
         # Update inventory_data dictionary by reading the CSV
         read_csv('SalesKaggle3new.csv')
@@ -360,6 +400,8 @@ def remove_item():
 
 
 def plot_sales():
+    import matplotlib.pyplot as plt
+
     sales_2022 = []
     sales_2023 = []
 
@@ -389,6 +431,8 @@ def plot_sales():
 
 
 def plot_new_sales():
+    import matplotlib.pyplot as plt
+
     item_ids = []
     sales_2024 = []
 
@@ -436,23 +480,20 @@ def report_missing_items():
             inventory_data[item_id]["MissingQty"] += missing_quantity
 
             # Read the CSV data and update the missing quantity
-            with open('SalesKaggle3new.csv', mode='r', newline='') as csvfile:
-                reader = csv.DictReader(csvfile)
-                header = reader.fieldnames
+            def update_missing(rows):
+                header = rows[0]
+                id_index = header.index('Product_id')
+                count_index = header.index('ItemCount')
                 missing_qty_index = header.index('MissingQty')  # Find the index of 'MissingQty'
 
-                rows = []
-                for row in reader:
-                    if int(row['Product_id']) == item_id:
-                        row['ItemCount'] = inventory_data[item_id]["quantity"]  # Update quantity in CSV
-                        row['MissingQty'] = inventory_data[item_id]["MissingQty"]  # Update MissingQty in CSV
-                    rows.append(row)
+                for row in rows[1:]:
+                    if int(row[id_index]) == item_id:
+                        row[count_index] = inventory_data[item_id]["quantity"]  # Update quantity in CSV
+                        row[missing_qty_index] = inventory_data[item_id]["MissingQty"]  # Update MissingQty in CSV
+                return rows
 
             # Rewrite the CSV file with updated quantity and MissingQty
-            with open('SalesKaggle3new.csv', mode='w', newline='') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=header)
-                writer.writeheader()
-                writer.writerows(rows)
+            storage.update_rows('SalesKaggle3new.csv', update_missing)
 
             messagebox.showinfo("Report Missing Items",
                                 f"{missing_quantity} units of item {item_id} reported as missing.")
@@ -478,23 +519,27 @@ def sell_item():
                 # Recalculate Lifetime_Sold after selling
                 inventory_data[item_id]["lifetime_sold"] += sold_quantity
 
-                # Read the CSV data
-                # Used Pandas Library
-                filename = 'SalesKaggle3new.csv'
-                df = pd.read_csv(filename)
-
-                # Update the CSV data for the sold item
-                # Used Pandas
-                for index, row in df.iterrows():
-                    if row['Product_id'] == item_id:
-                        df.at[index, 'ItemCount'] = inventory_data[item_id]["quantity"]
-                        df.at[index, '2024_Sales'] = inventory_data[item_id]["2024_Sales"]
-                        df.at[index, 'Lifetime_Sold'] = inventory_data[item_id]["lifetime_sold"]
-                        break
+                # Update the CSV data for the sold item. This runs while storage holds
+                # the file lock, so it works on plain csv rows rather than a DataFrame.
+                def update_sold(rows):
+                    header = rows[0]
+                    # Add the Lifetime_Sold column the first time an item is sold
+                    if 'Lifetime_Sold' not in header:
+                        header.append('Lifetime_Sold')
+                        for row in rows[1:]:
+                            row.append('')
+                    id_index = header.index('Product_id')
+
+                    for row in rows[1:]:
+                        if int(row[id_index]) == item_id:
+                            row[header.index('ItemCount')] = inventory_data[item_id]["quantity"]
+                            row[header.index('2024_Sales')] = inventory_data[item_id]["2024_Sales"]
+                            row[header.index('Lifetime_Sold')] = inventory_data[item_id]["lifetime_sold"]
+                            break
+                    return rows
 
                 # Write the updated CSV data back to the file
-                # https://stackoverflow.com/questions/16923281/writing-a-pandas-dataframe-to-csv-file
-                df.to_csv(filename, index=False)
+                storage.update_rows('SalesKaggle3new.csv', update_sold)
 
                 messagebox.showinfo("Sell Item", f"{sold_quantity} units of item {item_id} sold.")
             else:
@@ -506,7 +551,6 @@ def sell_item():
 
 
 if __name__ == "__main__":
-    read_csv('SalesKaggle3new.csv')
-    root = tk.Tk()
-    root.withdraw()
+    # Start loading the inventory while the user logs in
+    load_inventory_async('SalesKaggle3new.csv')
     main()